@@ -1,18 +1,26 @@
 import streamlit as st
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 import pandas as pd
 import plotly.express as px
+import backoff
 from datetime import datetime
 import time
 import os
-import re
+import json
+import ast
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urljoin, urlparse
 # import io # No longer needed
 
 # --- Instagram Data Fetching ---
 try:
     import instaloader
+    from instaloader.exceptions import ConnectionException, TooManyRequestsException
 except ImportError:
     st.error("Instaloader library not found. Please install it: pip install instaloader")
     st.stop()
@@ -21,80 +29,200 @@ except ImportError:
 TARGET_URL = "https://www.chapterhostels.com/" # Assuming this is the general brand URL
 INSTAGRAM_USERNAME = "chapterhostels" # Make sure this is the correct username
 DATA_FILE = "monitoring_data.csv" # Use a different file name
+LATEST_FILE = "latest.json" # Copy of the newest row, so the snapshot panel doesn't need the full history
 # Found via inspecting chaptersanfrancisco.com
 LOGO_URL = "https://www.chaptersanfrancisco.com/assets/B/themes/chaptersanfrancisco-new/img/logo-new.png"
+LOGO_FILE = "static/logo.png" # Local copy of LOGO_URL, downloaded on first run
+HISTORY_DISPLAY_ROWS = 500 # Default number of rows in the Raw Data History table
 
 REQUEST_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36'
 }
 
+# Upper bound on how much of a page is downloaded and parsed
+MAX_HTML_BYTES = 2_000_000
+
+# Compiled once; evaluated by libxml2 against the parsed page in _fetch_title_meta_h1
+TITLE_XPATH = etree.XPath('string(//title)')
+OG_DESCRIPTION_XPATH = etree.XPath('//meta[@property="og:description"]/@content')
+META_DESCRIPTION_XPATH = etree.XPath('//meta[@name="description"]/@content')
+H1_XPATH = etree.XPath('//h1')
+
+# Where to look for a sitemap when robots.txt doesn't declare one
+COMMON_SITEMAP_PATHS = ["/sitemap.xml", "/sitemap_index.xml", "/sitemap", "/sitemap.php"]
+
+# Shared session so the page, robots.txt and sitemap requests reuse pooled connections
+@st.cache_resource # Streamlit re-executes this module on every rerun; keep one pool per process
+def _get_session():
+    """Returns the shared requests.Session with keep-alive pooling and retry/backoff on 429/5xx."""
+    session = requests.Session()
+    session.headers.update(REQUEST_HEADERS)
+    # Only retry on status; a connect/read timeout already waited the full timeout, so it fails right away.
+    # raise_on_status=False hands back the last response once retries run out, so callers still see the status code
+    retries = Retry(total=2, connect=0, read=0, status=2, backoff_factor=0.3,
+                    status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+SESSION = _get_session()
+
 # Define expected columns for the CSV data - REMOVED SEMRUSH & GOOGLE INDEX
 ALL_COLUMNS = [
     'Timestamp', 'URL', 'Instagram Handle', 'Title', 'Meta Description',
-    'Robots.txt Exists', 'Sitemap Found', 'H1 Tags',
+    'Robots.txt Exists', 'Sitemap Found', 'Sitemap Status', 'H1 Tags',
     'Followers', 'Following', 'Posts'
 ]
 
 # Columns expected to be numeric for plotting/analysis - REMOVED SEMRUSH
 NUMERIC_COLUMNS = ['Followers', 'Following', 'Posts']
 
+# Text columns with few distinct values, stored as pandas categoricals once loaded
+CATEGORICAL_COLUMNS = ['URL', 'Instagram Handle', 'Sitemap Found', 'Sitemap Status']
+
+# dtypes handed to read_csv so columns are typed during the parse, not coerced afterwards
+CSV_DTYPES = {col: 'Int64' for col in NUMERIC_COLUMNS}
+CSV_DTYPES['Robots.txt Exists'] = 'boolean'
+for col in ['URL', 'Instagram Handle', 'Title', 'Meta Description', 'Sitemap Found', 'Sitemap Status', 'H1 Tags']:
+    CSV_DTYPES[col] = 'string'
+
+
+# Display labels for the 'Sitemap Status' column (see classify_sitemap)
+SITEMAP_STATUS_LABELS = {
+    "found": "✅ Found",
+    "missing": "❌ Not Found",
+    "no_directive": "⚠️ Not in robots.txt",
+    "unknown": "❓ Unknown",
+    "na": "N/A",
+}
+
 
 # --- Helper Functions ---
 
-def get_soup(url):
-    """Fetches URL content and returns BeautifulSoup object."""
+def classify_sitemap(sitemap_found):
+    """Maps a 'Sitemap Found' string to a SITEMAP_STATUS_LABELS key."""
+    if not isinstance(sitemap_found, str):
+        return "na"
+    if "http" in sitemap_found or ".xml" in sitemap_found or ".php" in sitemap_found:
+        return "found"
+    if "Not found" in sitemap_found:
+        return "missing"
+    if "Directive not found" in sitemap_found:
+        return "no_directive"
+    return "unknown"
+
+
+def flush_log(log):
+    """Renders (level, message) pairs buffered by the fetch functions, e.g. ("warning", "...")."""
+    for level, message in log:
+        getattr(st, level)(message)
+
+
+class FetchLog(list):
+    """A log for flush_log that also records whether a request failed (timeout, DNS, HTTP error, ...).
+
+    Notes such as a truncated or non-HTML page are plain appends and don't count as failures.
+    """
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    def failure(self, message, level="warning"):
+        self.append((level, message))
+        self.failed = True
+
+
+class WebsiteFetchFailed(Exception):
+    """Raised by _fetch_website_data so st.cache_data doesn't keep the result; carries (data, log)."""
+    def __init__(self, data, log):
+        super().__init__("website fetch failed")
+        self.data = data
+        self.log = log
+
+
+def get_html_tree(url, log):
+    """Fetches URL content and returns the root lxml element. Messages go to `log` (a FetchLog); failed requests via log.failure."""
     try:
-        response = requests.get(url, headers=REQUEST_HEADERS, timeout=15)
-        response.raise_for_status()
-        # Explicitly decode using UTF-8, handling potential errors
-        return BeautifulSoup(response.content, 'lxml', from_encoding='utf-8')
+        with SESSION.get(url, stream=True, timeout=15) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.startswith(('text/html', 'application/xhtml+xml')):
+                log.append(("warning", f"{url} did not return HTML (Content-Type: {content_type or 'unknown'})"))
+                return None
+            # Feed chunks as they arrive so parsing overlaps the download; decode as UTF-8.
+            # Comments and processing instructions are never read, so don't build nodes for them.
+            # (remove_blank_text is left off: it can glue together words split across inline tags in an h1.)
+            parser = etree.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+            received = 0
+            for chunk in response.iter_content(65536):
+                parser.feed(chunk[:MAX_HTML_BYTES - received])
+                received += len(chunk)
+                if received >= MAX_HTML_BYTES:
+                    log.append(("warning", f"{url} is larger than {MAX_HTML_BYTES:,} bytes; only the first part was parsed"))
+                    break
+            if received == 0:
+                log.append(("warning", f"{url} returned an empty page"))
+                return None
+            root = parser.close()
+            if root is None:
+                # e.g. a whitespace-only body; depending on the lxml version close() returns None or raises
+                log.append(("warning", f"{url} did not contain a parsable HTML document"))
+            return root
+    except etree.XMLSyntaxError as e:
+        log.append(("warning", f"{url} did not contain a parsable HTML document: {e}"))
+        return None
     except requests.exceptions.Timeout:
-        st.warning(f"Timeout fetching {url}")
+        log.failure(f"Timeout fetching {url}")
         return None
     except requests.exceptions.RequestException as e:
-        st.warning(f"Could not fetch {url}: {e}")
+        log.failure(f"Could not fetch {url}: {e}")
         return None
     except Exception as e:
-        st.error(f"Error parsing HTML from {url}: {e}")
+        log.failure(f"Error parsing HTML from {url}: {e}", level="error")
         return None
 
 
-def fetch_website_data(url):
-    """Fetches basic SEO data from the website."""
-    data = {
-        "Title": "N/A",
-        "Meta Description": "N/A",
-        "Robots.txt Exists": False,
-        "Sitemap Found": "N/A",
-        "H1 Tags": []
-    }
-    st.write(f"Fetching website data from {url}...")
-    soup = get_soup(url)
-    if not soup: return data
+def _fetch_title_meta_h1(url, log):
+    """Reads the title, meta description and H1 tags from the page itself."""
+    data = {"Title": "N/A", "Meta Description": "N/A", "H1 Tags": []}
+    tree = get_html_tree(url, log)
+    if tree is None: return data
 
-    title_tag = soup.find('title')
-    if title_tag and title_tag.string: data["Title"] = title_tag.string.strip()
+    title = TITLE_XPATH(tree).strip()
+    if title: data["Title"] = title
 
     # Prioritize 'og:description' as it's often better maintained for social sharing
-    og_desc = soup.find('meta', property='og:description')
-    if og_desc and og_desc.get('content'):
-        data["Meta Description"] = og_desc.get('content').strip()
+    og_desc = [c for c in OG_DESCRIPTION_XPATH(tree) if c.strip()]
+    if og_desc:
+        data["Meta Description"] = og_desc[0].strip()
     else:
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            data["Meta Description"] = meta_desc.get('content').strip()
+        meta_desc = [c for c in META_DESCRIPTION_XPATH(tree) if c.strip()]
+        if meta_desc:
+            data["Meta Description"] = meta_desc[0].strip()
 
-    h1_tags = soup.find_all('h1')
+    h1_texts = ("".join(h1.itertext()).strip() for h1 in H1_XPATH(tree))
     # Filter out empty or whitespace-only H1 tags
-    data["H1 Tags"] = [h1.text.strip() for h1 in h1_tags if h1.text.strip()]
+    data["H1 Tags"] = [text for text in h1_texts if text]
+    return data
 
+
+def _fetch_robots(url, log):
+    """Checks robots.txt and any Sitemap directives in it."""
+    data = {"Robots.txt Exists": False, "Sitemap Found": "N/A"}
     robots_url = urljoin(url, "/robots.txt")
     try:
-        robots_response = requests.get(robots_url, headers=REQUEST_HEADERS, timeout=10)
+        robots_response = SESSION.get(robots_url, timeout=10)
         if robots_response.status_code == 200:
             data["Robots.txt Exists"] = True
-            # Use findall to capture all Sitemap directives
-            sitemap_links = re.findall(r'Sitemap:\s*(.*)', robots_response.text, re.IGNORECASE)
+            # Capture all Sitemap directives straight from the bytes; avoids decoding
+            # (and charset-sniffing) the whole file just to find a few lines.
+            # A UTF-8 BOM would otherwise hide a directive on the first line.
+            content = robots_response.content.removeprefix(b"\xef\xbb\xbf")
+            sitemap_links = [line.split(b":", 1)[1].strip().decode("utf-8", "replace")
+                             for line in (raw.lstrip() for raw in content.splitlines())
+                             if line[:8].lower() == b"sitemap:"]
             if sitemap_links:
                 data["Sitemap Found"] = ", ".join([link.strip() for link in sitemap_links])
             else:
@@ -103,98 +231,223 @@ def fetch_website_data(url):
              pass # robots.txt exists but doesn't mean sitemap isn't elsewhere
 
     except requests.exceptions.RequestException as e:
-        st.warning(f"Could not check {robots_url}: {e}")
+        log.failure(f"Could not check {robots_url}: {e}")
+    return data
 
 
-    # If sitemap not found via robots.txt or robots.txt failed, check common locations
-    if not data["Sitemap Found"] or "Directive not found" in data["Sitemap Found"] or data["Sitemap Found"] == "N/A":
-        common_sitemaps = ["/sitemap.xml", "/sitemap_index.xml", "/sitemap", "/sitemap.php"]
-        found_sm = False
-        found_urls = []
-        for smap in common_sitemaps:
-            sitemap_url = urljoin(url, smap)
+def _fetch_common_sitemaps(url, log):
+    """Probes COMMON_SITEMAP_PATHS; returns {"Sitemap Found": ...} for the ones that answer, or {} if none do."""
+    sitemap_urls = [urljoin(url, smap) for smap in COMMON_SITEMAP_PATHS]
+    found_urls = []
+    # The probes are independent, so run them side by side instead of one timeout after another
+    with ThreadPoolExecutor(max_workers=len(sitemap_urls)) as executor:
+        futures = {executor.submit(SESSION.head, sitemap_url, timeout=7, allow_redirects=True): sitemap_url
+                   for sitemap_url in sitemap_urls}
+        for future in as_completed(futures):
             try:
-                sitemap_response = requests.head(sitemap_url, headers=REQUEST_HEADERS, timeout=7, allow_redirects=True)
-                if sitemap_response.status_code == 200:
-                    found_urls.append(sitemap_url)
-                    found_sm = True
+                if future.result().status_code == 200:
+                    found_urls.append(futures[future])
             except requests.exceptions.RequestException:
                 continue
+    # Keep the reported order stable regardless of which probe answered first
+    found_urls.sort(key=sitemap_urls.index)
+    return {"Sitemap Found": ", ".join(found_urls)} if found_urls else {}
 
-        if found_sm:
-             data["Sitemap Found"] = ", ".join(found_urls)
-        elif data["Sitemap Found"] == "Directive not found in robots.txt" or data["Sitemap Found"] == "N/A":
-             data["Sitemap Found"] = "Not found (checked robots.txt & common paths)"
 
+def _fetch_sitemaps(url, log):
+    """robots.txt first; the common paths are only probed if it didn't declare a sitemap."""
+    data = _fetch_robots(url, log)
+    # If sitemap not found via robots.txt or robots.txt failed, check common locations
+    if data["Sitemap Found"] in ("N/A", "Directive not found in robots.txt"):
+        data.update(_fetch_common_sitemaps(url, log)
+                    or {"Sitemap Found": "Not found (checked robots.txt & common paths)"})
     return data
 
+
+def fetch_website_data(url, rev=0):
+    """Uncached wrapper around _fetch_website_data that also returns the partial result of a failed fetch.
+
+    Returns (data, log, fetched_at); fetched_at is when the data was actually fetched,
+    so it's older than the call when the result came from the cache.
+
+    A failed fetch isn't cached, so a timeout or DNS failure is retried on the next click
+    instead of being saved again for an hour.
+    """
+    try:
+        return _fetch_website_data(url, rev)
+    except WebsiteFetchFailed as e:
+        return e.data, e.log, datetime.now()
+
+
+@st.cache_data(ttl=3600, show_spinner=False) # Cache for 1 hour, like the Instagram fetch
+def _fetch_website_data(url, rev=0):
+    """Fetches basic SEO data from the website. Returns (data, log, fetched_at) so it can run off the script thread.
+
+    The page stage (title/meta/H1) and the robots.txt/sitemap stage are independent
+    (_fetch_title_meta_h1 and _fetch_sitemaps), so they run side by side.
+    `rev` is only part of the cache key: pass a new value to bypass a cached result.
+    Raises WebsiteFetchFailed if a request failed; st.cache_data doesn't cache exceptions.
+    """
+    log = FetchLog()
+    sitemap_log = FetchLog()
+    # The sitemap chain doesn't depend on the page, so run it while the page downloads and parses
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sitemap_future = executor.submit(_fetch_sitemaps, url, sitemap_log)
+        data = _fetch_title_meta_h1(url, log)
+        data.update(sitemap_future.result())
+    data["Sitemap Status"] = classify_sitemap(data["Sitemap Found"])
+    log.extend(sitemap_log)
+    if log.failed or sitemap_log.failed:
+        raise WebsiteFetchFailed(data, list(log))
+    return data, list(log), datetime.now()
+
+
 # --- Instagram Data Fetching Function ---
-@st.cache_data(ttl=3600) # Cache for 1 hour
+@st.cache_resource(show_spinner=False) # One loader per process so its requests session survives reruns; also built off the script thread by the warm-up below
+def _get_loader():
+    """Returns the shared Instaloader instance."""
+    return instaloader.Instaloader(
+        user_agent=REQUEST_HEADERS['User-Agent'],
+        quiet=True,
+        compress_json=False,
+        download_pictures=False,
+        download_videos=False,
+        download_video_thumbnails=False,
+        download_geotags=False,
+        download_comments=False,
+        save_metadata=False,
+        post_metadata_txt_pattern="",
+        # _get_profile already retries with backoff; Instaloader's own retries would multiply the attempts
+        max_connection_attempts=1
+        )
+
+
+# Build the loader in the background once per session, so the first fetch click doesn't pay for it.
+# Construction has no Streamlit side effects, so it's safe off the script thread.
+if "insta_warmed" not in st.session_state:
+    st.session_state["insta_warmed"] = True
+    threading.Thread(target=_get_loader, daemon=True).start()
+
+
+# Transient network errors and rate limits are retried with jittered exponential backoff;
+# anything else (profile not found, login required, ...) propagates on the first try
+@backoff.on_exception(backoff.expo, (ConnectionException, TooManyRequestsException),
+                      max_tries=4, max_time=30, jitter=backoff.full_jitter)
+def _get_profile(loader, username):
+    """Looks up an Instagram profile."""
+    return instaloader.Profile.from_username(loader.context, username)
+
+
+@st.cache_data(ttl=3600, show_spinner=False) # Cache for 1 hour; runs on a worker thread, where a spinner can't render
+def _fetch_instagram_counts(username):
+    """Looks up the profile counts; returns (counts, fetched_at). Raises on failure, and
+    st.cache_data doesn't cache exceptions, so only successful lookups are reused."""
+    profile = _get_profile(_get_loader(), username)
+    counts = {"Followers": profile.followers, "Following": profile.followees, "Posts": profile.mediacount}
+    return counts, datetime.now()
+
+
 def fetch_instagram_data(username):
-    """Fetches Instagram profile data using Instaloader."""
+    """Fetches Instagram profile data using Instaloader. Returns (data, log, fetched_at) like fetch_website_data."""
+    log = []
     data = {"Followers": pd.NA, "Following": pd.NA, "Posts": pd.NA} # Use pandas NA for consistency
-    st.write(f"Fetching Instagram data for @{username}...")
+    fetched_at = datetime.now() # A failed lookup is never cached, so it's always fresh
     try:
-        L = instaloader.Instaloader(
-            user_agent=REQUEST_HEADERS['User-Agent'],
-            quiet=True,
-            compress_json=False,
-            download_pictures=False,
-            download_videos=False,
-            download_video_thumbnails=False,
-            download_geotags=False,
-            download_comments=False,
-            save_metadata=False
-            )
-        profile = instaloader.Profile.from_username(L.context, username)
-        data["Followers"] = profile.followers
-        data["Following"] = profile.followees
-        data["Posts"] = profile.mediacount
-        st.success(f"Successfully fetched Instagram data for @{username}")
-    except instaloader.exceptions.ProfileNotFoundError:
-        st.error(f"Instagram profile @{username} not found.")
+        counts, fetched_at = _fetch_instagram_counts(username)
+        data.update(counts)
+        log.append(("success", f"Successfully fetched Instagram data for @{username}"))
+    except instaloader.exceptions.ProfileNotExistsException:
+        log.append(("error", f"Instagram profile @{username} not found."))
     except instaloader.exceptions.LoginRequiredException:
-        st.error(f"Login required to fetch data for @{username}. Instaloader session file might be needed.")
+        log.append(("error", f"Login required to fetch data for @{username}. Instaloader session file might be needed."))
     except instaloader.exceptions.PrivateProfileNotFollowedException:
-        st.error(f"Profile @{username} is private and not followed by the Instaloader session.")
+        log.append(("error", f"Profile @{username} is private and not followed by the Instaloader session."))
     except instaloader.exceptions.ConnectionException as e:
-        st.error(f"Connection error fetching Instagram data: {e}. Might be rate-limited or network issue.")
+        log.append(("error", f"Connection error fetching Instagram data: {e}. Might be rate-limited or network issue."))
     except Exception as e:
-        st.error(f"An unexpected error occurred fetching Instagram data for @{username}: {e}")
+        log.append(("error", f"An unexpected error occurred fetching Instagram data for @{username}: {e}"))
     finally:
         # Ensure correct NA type
         for key in data:
             if data[key] is None: data[key] = pd.NA
-        return data
+        return data, log, fetched_at
+
+
+def fetch_all(target_url, username, website_rev=0):
+    """Runs the website and Instagram fetches side by side.
+
+    They hit different hosts and are both network-bound, so the cycle takes as
+    long as the slower of the two. Returns ((website_info, website_log, website_fetched_at),
+    (insta_info, insta_log, insta_fetched_at)).
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        f_web = executor.submit(fetch_website_data, target_url, website_rev)
+        f_ig = executor.submit(fetch_instagram_data, username)
+        return f_web.result(), f_ig.result()
 
 
 # --- Data Loading and Saving ---
 def load_historical_data(filepath):
-    """Loads historical data from CSV, ensuring all columns exist and types are correct."""
+    """Loads historical data from CSV, reusing the parsed frame until the file changes.
+
+    See _load_historical_data for the column guarantees.
+    """
+    try:
+        stat = os.stat(filepath)
+        file_version = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        file_version = None
+    return _load_historical_data(filepath, file_version)
+
+
+def _coerce_csv_dtypes(df):
+    """Brings string-read columns to their CSV_DTYPES type, turning values that don't parse into NA."""
+    for col, dtype in CSV_DTYPES.items():
+        if col not in df.columns or dtype == 'string':
+            continue
+        if dtype == 'Int64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        elif dtype == 'boolean':
+            df[col] = df[col].str.strip().str.lower().map({'true': True, 'false': False}).astype('boolean')
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=4) # Keyed by (path, file version), so any write invalidates it
+def _load_historical_data(filepath, file_version):
+    """Loads historical data from CSV, ensuring all columns exist and types are correct.
+
+    Post-condition: 'Timestamp' is a tz-naive datetime64 column with no NaT,
+    so callers can use the .dt accessor without re-parsing. Rows keep file
+    order, which is chronological because save_historical_data only appends.
+    """
     if os.path.exists(filepath):
         try:
-            df = pd.read_csv(filepath)
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+            read_kwargs = dict(parse_dates=['Timestamp'], usecols=lambda col: col in ALL_COLUMNS)
+            try:
+                df = pd.read_csv(filepath, dtype=CSV_DTYPES, **read_kwargs)
+            except ValueError:
+                # One cell the typed parse rejects (e.g. a hand-edited "abc" in Followers) fails the whole
+                # read; parse everything as text instead and coerce per cell, so only that cell becomes NA
+                df = pd.read_csv(filepath, dtype={col: 'string' for col in CSV_DTYPES}, **read_kwargs)
+                df = _coerce_csv_dtypes(df)
+            if not pd.api.types.is_datetime64_dtype(df['Timestamp']):
+                # A malformed value leaves the column unparsed; coerce so those rows drop below
+                df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
             df = df.dropna(subset=['Timestamp'])
 
-            # Ensure all expected columns exist (no Semrush/Google)
-            for col in ALL_COLUMNS:
-                if col not in df.columns:
-                    if col in NUMERIC_COLUMNS:
-                         df[col] = pd.NA
-                    else:
-                         df[col] = pd.NA
+            assert pd.api.types.is_datetime64_dtype(df['Timestamp']) and not df['Timestamp'].isna().any()
+            # Adds any expected column missing from the file (as NA) and fixes the column order
+            df = df.reindex(columns=ALL_COLUMNS)
+            # Rows saved before 'Sitemap Status' existed get it derived from 'Sitemap Found'.
+            # Cast first: when reindex adds the column it is float64, which rejects string values.
+            df['Sitemap Status'] = df['Sitemap Status'].astype('string').fillna(df['Sitemap Found'].map(classify_sitemap))
 
-            # Coerce numeric types (no Semrush/Google)
+            # Shrink the frame: counts fit in small ints, and these columns repeat the same few values every row
             for col in NUMERIC_COLUMNS:
-                 if col in df.columns:
-                     df[col] = pd.to_numeric(df[col], errors='coerce')
-
-            # Handle H1 Tags
-            if 'H1 Tags' in df.columns:
-                 df['H1 Tags'] = df['H1 Tags'].astype(str).fillna(pd.NA)
-
-            return df[ALL_COLUMNS] # Ensure column order
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+            for col in CATEGORICAL_COLUMNS:
+                df[col] = df[col].astype('category')
+            return df
         except Exception as e:
             st.error(f"Error reading or processing data file {filepath}: {e}. Starting fresh.")
             df = pd.DataFrame(columns=ALL_COLUMNS)
@@ -212,42 +465,162 @@ def load_historical_data(filepath):
         return df
 
 
-def save_historical_data(data_dict, filepath):
-    """Appends new data to the CSV, ensuring schema consistency."""
-    df_history = load_historical_data(filepath)
+def _is_missing(value):
+    """True for None/NaN/pd.NA scalars (lists such as H1 Tags are never missing)."""
+    return value is None or (not isinstance(value, list) and pd.isna(value))
 
-    new_data_df = pd.DataFrame([data_dict])
-    new_data_df['Timestamp'] = pd.to_datetime(new_data_df['Timestamp'], errors='coerce')
 
-    # Ensure all expected columns exist (no Semrush/Google)
-    for col in ALL_COLUMNS:
-        if col not in new_data_df.columns:
-            if col in NUMERIC_COLUMNS:
-                new_data_df[col] = pd.NA
-            else:
-                new_data_df[col] = pd.NA
+def _to_int_or_blank(value):
+    """CSV cell for a count column; missing or non-numeric values are left blank."""
+    if _is_missing(value):
+        return ''
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return ''
 
-    # Reorder columns
-    new_data_df = new_data_df[ALL_COLUMNS]
 
-    # Convert numeric columns (no Semrush/Google)
-    for col in NUMERIC_COLUMNS:
-        if col in new_data_df.columns:
-            new_data_df[col] = pd.to_numeric(new_data_df[col], errors='coerce')
+def _format_timestamp(value):
+    """CSV cell for the Timestamp column, in the same format the existing rows use."""
+    return '' if _is_missing(value) else value.strftime('%Y-%m-%d %H:%M:%S.%f')
 
-    # Handle H1 Tags list
-    if 'H1 Tags' in new_data_df.columns:
-         new_data_df['H1 Tags'] = new_data_df['H1 Tags'].apply(lambda x: str(x) if isinstance(x, list) else x)
 
-    df_updated = pd.concat([df_history, new_data_df], ignore_index=True)
-    df_updated = df_updated.sort_values(by="Timestamp", ascending=True)
+# How each column is written to the CSV; any other column is written as-is (blank if missing)
+CSV_CELL_FORMATTERS = {
+    'Timestamp': _format_timestamp,
+    'H1 Tags': lambda value: json.dumps(value if isinstance(value, list) else []), # JSON array string
+    'Followers': _to_int_or_blank,
+    'Following': _to_int_or_blank,
+    'Posts': _to_int_or_blank,
+}
 
+
+def _migrate_csv_columns(filepath):
+    """Rewrites an existing CSV once if its header differs from ALL_COLUMNS, so appended rows line up.
+
+    Values are carried over as the raw strings already in the file; new columns start blank
+    and columns no longer in ALL_COLUMNS are dropped. Streams row by row with the csv module,
+    so the write path never loads the history into pandas.
+    """
+    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+        return
+    with open(filepath, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), None)
+    if header == ALL_COLUMNS:
+        return
+    tmp_path = f"{filepath}.tmp"
+    with open(filepath, newline='', encoding='utf-8') as src, open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+        writer = csv.DictWriter(dst, fieldnames=ALL_COLUMNS, restval='', extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(csv.DictReader(src))
+    os.replace(tmp_path, filepath)
+
+
+def load_latest_snapshot(filepath, history_filepath=DATA_FILE):
+    """Loads the newest row written by save_historical_data, or None if there isn't a usable one.
+
+    The snapshot is also treated as unusable when `history_filepath` was modified after it
+    (e.g. the CSV was edited or restored by hand), so the caller falls back to the history.
+    """
     try:
-        df_updated.to_csv(filepath, index=False)
+        if os.path.exists(history_filepath) and os.stat(history_filepath).st_mtime_ns > os.stat(filepath).st_mtime_ns:
+            return None
+        with open(filepath, encoding='utf-8') as f:
+            # null -> pd.NA so the panels treat it exactly like a history row
+            snapshot = {col: pd.NA if value is None else value for col, value in json.load(f).items()}
+        snapshot['Timestamp'] = pd.Timestamp(snapshot['Timestamp'])
+        if pd.isna(snapshot.get('Sitemap Status', pd.NA)):
+            # Snapshot written before the column existed
+            snapshot['Sitemap Status'] = classify_sitemap(snapshot.get('Sitemap Found'))
+        return snapshot
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_historical_data(data_dict, filepath, latest_filepath=LATEST_FILE):
+    """Appends new data to the CSV, ensuring schema consistency.
+
+    Only the new row is written (header too if the file is new), so saving
+    costs the same no matter how long the history gets. The same row is also
+    stored on its own in `latest_filepath` for load_latest_snapshot.
+    """
+    row = {}
+    for col in ALL_COLUMNS:
+        value = data_dict.get(col)
+        if col in CSV_CELL_FORMATTERS:
+            row[col] = CSV_CELL_FORMATTERS[col](value)
+        else:
+            row[col] = '' if _is_missing(value) else value
+
+    try:
+        _migrate_csv_columns(filepath)
+        # Rows arrive in time order, so appending keeps the file sorted by Timestamp
+        write_header = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+        with open(filepath, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=ALL_COLUMNS, lineterminator='\n')
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
+        # Blank cells become null; write-then-rename so a reader never sees a half-written file
+        tmp_path = f"{latest_filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({col: None if cell == '' else cell for col, cell in row.items()}, f)
+        os.replace(tmp_path, latest_filepath)
     except Exception as e:
         st.error(f"Failed to save data to {filepath}: {e}")
 
 
+@st.cache_resource(show_spinner=False) # Check/download at most once per process; a failure raises, so it isn't cached
+def _download_logo():
+    """Downloads LOGO_URL into LOGO_FILE if it isn't there yet and returns the local path."""
+    if not os.path.exists(LOGO_FILE):
+        # A plain request, not SESSION: this runs before the page renders, so no retries and a short timeout
+        response = requests.get(LOGO_URL, headers=REQUEST_HEADERS, timeout=3)
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(LOGO_FILE), exist_ok=True)
+        with open(f"{LOGO_FILE}.tmp", 'wb') as f:
+            f.write(response.content)
+        os.replace(f"{LOGO_FILE}.tmp", LOGO_FILE) # Never leave a half-written logo behind
+    return LOGO_FILE
+
+
+def get_logo():
+    """Returns the local logo path, or LOGO_URL if it couldn't be downloaded.
+
+    A failed download is only remembered for this session, so a later session tries again.
+    """
+    if st.session_state.get("logo_download_failed"):
+        return LOGO_URL
+    try:
+        return _download_logo()
+    except (requests.exceptions.RequestException, OSError):
+        st.session_state["logo_download_failed"] = True
+        return LOGO_URL
+
+
+# --- Charts ---
+def _history_cache_key(df):
+    """Cheap stand-in for hashing a history frame: (row count, newest Timestamp in ns).
+
+    History is append-only, so any new row changes this key.
+    """
+    return (len(df), df['Timestamp'].iloc[-1].value if len(df) else 0)
+
+
+@st.cache_data(show_spinner=False, max_entries=4, hash_funcs={pd.DataFrame: _history_cache_key})
+def build_trend_figure(df, y_col, title, y_label):
+    """Builds the line chart for one history column, or returns None if it has fewer than two points."""
+    df_plot = df.dropna(subset=[y_col]).copy()
+    df_plot[y_col] = pd.to_numeric(df_plot[y_col], errors='coerce')
+    df_plot = df_plot.dropna(subset=[y_col]) # Drop again after coercion
+
+    if len(df_plot) <= 1:
+        return None
+    fig = px.line(df_plot, x='Timestamp', y=y_col, title=title, markers=True, labels={'Timestamp': 'Date', y_col: y_label})
+    fig.update_layout(xaxis_title='Date', yaxis_title=y_label)
+    return fig
+
+
 # --- Streamlit App Layout ---
 
 st.set_page_config(page_title="Chapter Hostels Presence", layout="wide")
@@ -255,7 +628,7 @@ st.set_page_config(page_title="Chapter Hostels Presence", layout="wide")
 # --- Header Section ---
 col_logo, col_title = st.columns([1, 5])
 with col_logo:
-    st.image(LOGO_URL, width=150)
+    st.image(get_logo(), width=150)
 with col_title:
     st.title("Chapter Hostels: Online Presence & Strategy")
     st.caption("Social Media Growth Plan & Basic Monitoring Dashboard")
@@ -357,68 +730,95 @@ with tab2:
     st.markdown(f"Monitoring **{TARGET_URL}** and Instagram **@{INSTAGRAM_USERNAME}**")
 
     # --- Data Fetching Trigger ---
+    force_refresh = st.checkbox("Bypass cached results", key="force_refresh",
+                                help="Website and Instagram results are cached for 1 hour. Tick to fetch fresh data.")
     if st.button("🔄 Fetch Latest Monitoring Data", key="fetch_monitor_data"):
         timestamp = datetime.now()
         st.info(f"Fetching monitoring data at {timestamp.strftime('%Y-%m-%d %H:%M:%S')}...")
+        if force_refresh:
+            # Only the two fetch caches are bypassed; the history and chart caches stay valid.
+            # A new rev is a new cache key for fetch_website_data.
+            st.session_state["website_rev"] = st.session_state.get("website_rev", 0) + 1
+            _fetch_instagram_counts.clear()
 
         # --- Fetch Website and Instagram Data ---
-        website_info = {}
-        insta_info = {}
-
         col_fetch1, col_fetch2 = st.columns(2) # Use 2 columns now
+        col_fetch1.write(f"Fetching website data from {TARGET_URL}...")
+        col_fetch2.write(f"Fetching Instagram data for @{INSTAGRAM_USERNAME}...")
 
-        with col_fetch1:
-            with st.spinner("Fetching website data..."):
-                website_info = fetch_website_data(TARGET_URL) # Fetch from general URL
+        # st.* calls aren't safe from worker threads; each fetch returns its messages instead.
+        with st.spinner("Fetching website + Instagram data..."):
+            (website_info, website_log, website_fetched_at), (insta_info, insta_log, insta_fetched_at) = fetch_all(
+                TARGET_URL, INSTAGRAM_USERNAME, website_rev=st.session_state.get("website_rev", 0)) # Fetch from general URL
 
+        with col_fetch1:
+            flush_log(website_log)
         with col_fetch2:
-            with st.spinner("Fetching Instagram data..."):
-                insta_info = fetch_instagram_data(INSTAGRAM_USERNAME)
-
-        # --- Combine Data (No Semrush / Google Index) ---
-        current_data = {
-            "Timestamp": timestamp,
-            "URL": TARGET_URL,
-            "Instagram Handle": INSTAGRAM_USERNAME,
-            "Title": website_info.get("Title", pd.NA),
-            "Meta Description": website_info.get("Meta Description", pd.NA),
-            "Robots.txt Exists": website_info.get("Robots.txt Exists", False),
-            "Sitemap Found": website_info.get("Sitemap Found", pd.NA),
-            "H1 Tags": website_info.get("H1 Tags", []),
-            "Followers": insta_info.get("Followers", pd.NA),
-            "Following": insta_info.get("Following", pd.NA),
-            "Posts": insta_info.get("Posts", pd.NA),
-        }
-
-        # --- Ensure all columns are present before saving ---
-        for col in ALL_COLUMNS:
-             if col not in current_data:
-                 current_data[col] = pd.NA # Add missing columns as NA
-
-        # Save Data
-        with st.spinner("Saving data..."):
-            save_historical_data(current_data, DATA_FILE)
-
-        st.success("Monitoring data fetched and saved successfully!")
-        st.balloons()
-        # Clear caches after fetching new data
-        st.cache_data.clear()
+            flush_log(insta_log)
+
+        # A cached result is older than this click. Saving it under a new timestamp would
+        # record an observation that was never made, so a click with nothing fresh saves nothing.
+        website_cached = website_fetched_at < timestamp
+        insta_cached = insta_fetched_at < timestamp
+        if website_cached and insta_cached:
+            st.info(f"Website and Instagram results are still cached from {max(website_fetched_at, insta_fetched_at):%H:%M:%S}, "
+                    "so no new row was saved. Tick 'Bypass cached results' to fetch fresh data.")
+        else:
+            if website_cached:
+                st.info(f"Website results are cached from {website_fetched_at:%H:%M:%S}; only Instagram was fetched fresh.")
+            elif insta_cached:
+                st.info(f"Instagram results are cached from {insta_fetched_at:%H:%M:%S}; only the website was fetched fresh.")
+
+            # --- Combine Data (No Semrush / Google Index) ---
+            current_data = {
+                "Timestamp": max(website_fetched_at, insta_fetched_at), # The fresh fetch; cached ones are older
+                "URL": TARGET_URL,
+                "Instagram Handle": INSTAGRAM_USERNAME,
+                "Title": website_info.get("Title", pd.NA),
+                "Meta Description": website_info.get("Meta Description", pd.NA),
+                "Robots.txt Exists": website_info.get("Robots.txt Exists", False),
+                "Sitemap Found": website_info.get("Sitemap Found", pd.NA),
+                "Sitemap Status": website_info.get("Sitemap Status", "na"),
+                "H1 Tags": website_info.get("H1 Tags", []),
+                "Followers": insta_info.get("Followers", pd.NA),
+                "Following": insta_info.get("Following", pd.NA),
+                "Posts": insta_info.get("Posts", pd.NA),
+            }
+
+            # --- Ensure all columns are present before saving ---
+            for col in ALL_COLUMNS:
+                 if col not in current_data:
+                     current_data[col] = pd.NA # Add missing columns as NA
+
+            # Save Data
+            with st.spinner("Saving data..."):
+                save_historical_data(current_data, DATA_FILE)
+
+            st.success("Monitoring data fetched and saved successfully!")
+            st.balloons()
+        # The history cache is keyed by the file's mtime/size, so the write above already
+        # invalidated it; the Instagram result we just stored is the freshest there is
 
 
     # --- Load and Display Data ---
     st.divider()
     st.subheader("📈 Current Snapshot & Growth Trends")
 
-    history_df = load_historical_data(DATA_FILE)
-
-    if history_df.empty:
+    # The snapshot panels only need the newest row; the full history is loaded for the trends below
+    history_df = None
+    latest_data = load_latest_snapshot(LATEST_FILE, DATA_FILE)
+    if latest_data is None:
+        # No snapshot file yet (e.g. history saved before it existed) or it's older than the CSV - fall back to the history
+        history_df = load_historical_data(DATA_FILE)
+        if not history_df.empty:
+            # An O(n) scan, no need to sort the whole history
+            latest_data = history_df.loc[history_df['Timestamp'].idxmax()]
+
+    if latest_data is None:
         st.warning("No historical monitoring data found. Click 'Fetch Latest Monitoring Data' to begin.")
     else:
-        # Display Latest Data
-        history_df = history_df.sort_values(by="Timestamp", ascending=False)
-        latest_data = history_df.iloc[0]
 
-        st.caption(f"Last updated: {latest_data['Timestamp'].strftime('%Y-%m-%d %H:%M:%S') if pd.notna(latest_data['Timestamp']) else 'N/A'}")
+        st.caption(f"Last updated: {latest_data['Timestamp'].strftime('%Y-%m-%d %H:%M:%S')}")
 
         # --- Metrics Display (Adjusted to 2 columns) ---
         col1, col2 = st.columns(2)
@@ -447,21 +847,10 @@ with tab2:
         # SEO & Website Metrics
         with col2:
             st.markdown("##### Website SEO Basics")
-            st.metric("Robots.txt Found?", "Yes" if latest_data.get("Robots.txt Exists", False) else "No")
-            # Improved Sitemap Display
-            sitemap_status = latest_data.get("Sitemap Found", "N/A")
-            sitemap_display = "N/A"
-            if pd.notna(sitemap_status) and isinstance(sitemap_status, str):
-                if "http" in sitemap_status or ".xml" in sitemap_status or ".php" in sitemap_status:
-                    sitemap_display = "✅ Found"
-                elif "Not found" in sitemap_status:
-                    sitemap_display = "❌ Not Found"
-                elif "Directive not found" in sitemap_status:
-                    sitemap_display = "⚠️ Not in robots.txt"
-                else:
-                    sitemap_display = "❓ Unknown" # Or display the string itself
-            elif pd.isna(sitemap_status):
-                sitemap_display = "N/A"
+            robots_exists = latest_data.get("Robots.txt Exists", False)
+            st.metric("Robots.txt Found?", "Yes" if pd.notna(robots_exists) and robots_exists else "No")
+            # Classified once at fetch time, so this is a plain lookup
+            sitemap_display = SITEMAP_STATUS_LABELS.get(latest_data.get("Sitemap Status", "na"), "N/A")
             st.metric("Sitemap Status", sitemap_display)
 
 
@@ -475,14 +864,16 @@ with tab2:
         st.write(f"**H1 Tags Found:**")
         h1s_raw = latest_data.get('H1 Tags', pd.NA)
         h1_list = []
-        if pd.notna(h1s_raw) and isinstance(h1s_raw, str) and h1s_raw.startswith('[') and h1s_raw.endswith(']'):
+        # Stored as a JSON array string (missing values load as NA, not str)
+        if isinstance(h1s_raw, str) and h1s_raw:
             try:
-                import ast
-                h1_list = ast.literal_eval(h1s_raw) # Safely evaluate string representation of list
-            except (ValueError, SyntaxError):
-                h1_list = [f"Error parsing H1 tags from stored string: {h1s_raw}"]
-        elif isinstance(h1s_raw, list): # Should not happen if saved correctly, but handle just in case
-            h1_list = h1s_raw
+                h1_list = json.loads(h1s_raw)
+            except ValueError:
+                try:
+                    # Rows saved before the JSON format hold str(list), e.g. "['Hostels', 'Chapter Hostels']"
+                    h1_list = ast.literal_eval(h1s_raw)
+                except (ValueError, SyntaxError):
+                    h1_list = [f"Error parsing H1 tags from stored string: {h1s_raw}"]
 
         if h1_list:
             st.code("\n".join([f"- {h1}" for h1 in h1_list]))
@@ -495,8 +886,10 @@ with tab2:
         st.divider()
         st.subheader("📉 Growth Over Time")
 
-        plot_df = history_df.copy()
-        plot_df['Timestamp'] = pd.to_datetime(plot_df['Timestamp'])
+        if history_df is None:
+            history_df = load_historical_data(DATA_FILE)
+
+        plot_df = history_df # Timestamp is already parsed and NaT-free (see load_historical_data)
 
         # Plotting function
         def plot_trend(df, y_col, title, y_label):
@@ -505,18 +898,14 @@ with tab2:
                 st.warning(f"Column '{y_col}' not found in data for plotting.")
                 return
 
-            df_plot = df.dropna(subset=['Timestamp', y_col]).copy()
-            df_plot[y_col] = pd.to_numeric(df_plot[y_col], errors='coerce')
-            df_plot = df_plot.dropna(subset=[y_col]) # Drop again after coercion
-
-            if len(df_plot) > 1:
-                fig = px.line(df_plot, x='Timestamp', y=y_col, title=title, markers=True, labels={'Timestamp': 'Date', y_col: y_label})
-                fig.update_layout(xaxis_title='Date', yaxis_title=y_label)
+            # Reruns with unchanged history reuse the cached figure instead of rebuilding it
+            fig = build_trend_figure(df, y_col, title, y_label)
+            if fig is not None:
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.write(f"Not enough valid data points (need > 1) to plot {title}.")
 
-        if len(plot_df.dropna(subset=['Timestamp'])) > 1:
+        if len(plot_df) > 1:
             # --- Instagram Plots ---
             st.markdown("##### Instagram Trends")
             plot_trend(plot_df, 'Followers', 'Instagram Follower Growth', 'Followers')
@@ -530,7 +919,12 @@ with tab2:
         # Show most recent first, ensure Timestamp is first column
         # Filter display_df columns based on the final ALL_COLUMNS list
         display_columns = ['Timestamp'] + [col for col in ALL_COLUMNS if col != 'Timestamp']
-        display_df = history_df[display_columns].copy()
+        # Only the most recent rows are shown (and formatted); a slider appears once there are more
+        display_rows = len(history_df)
+        if display_rows > HISTORY_DISPLAY_ROWS:
+            display_rows = st.slider("Rows to show (most recent first)", min_value=HISTORY_DISPLAY_ROWS,
+                                     max_value=len(history_df), value=HISTORY_DISPLAY_ROWS, key="history_rows")
+        display_df = history_df.iloc[-display_rows:][display_columns].iloc[::-1].copy() # File order is oldest first; slice before copying
         display_df['Timestamp'] = display_df['Timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
         st.dataframe(display_df)
 